@@ -13,21 +13,13 @@ Options:
   -v --verbose          Display more information.
 
 """
-import configparser
-import json
 import os
+import re
 import sys
-from configparser import ConfigParser
+import time
 from datetime import datetime
 
-import docopt as docpt
-import tldextract
-from docopt import docopt
-from ip_resolver import IpResolver, IpResolverError
-
 # options
-from livedns_client import LiveDNSClient
-
 options = None  # type: dict
 debug = False  # type: bool
 dry_run = False  # type: bool
@@ -38,7 +30,16 @@ log_file = None  # type: str
 out_file = None  # type: str
 
 # variables
-config = {}  # type: ConfigParser
+config = {}  # type: dict[str,dict[str,str]]
+
+# minimal INI constructs, anything fancier falls back to configparser
+_INI_SECTION_RE = re.compile(r'^\[([^\]]+)\]\s*$')
+_INI_KV_RE = re.compile(r'^([^=;#\s][^=]*?)\s*=\s*(.*?)\s*$')
+
+# verified domains cache, shared between invocations: a domain existing in the
+# Gandi account is stable enough to only re-check it once a day
+_DOMAINS_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "dyn-gandi", "domains.json")
+_DOMAINS_CACHE_TTL = 86400
 
 
 def parse_options():
@@ -64,121 +65,296 @@ def parse_configuration():
 
     global config
 
-    config = configparser.ConfigParser()
-    config.read(conf_file)
+    config = parse_ini(conf_file)
+    if config is None:
+        # unsupported construct found, let the full configparser machinery handle it
+        import configparser
 
+        config = configparser.ConfigParser()
+        config.read(conf_file)
 
-def livedns_handle(domain, ip, records):
-    """Query LiveDNS API.
 
-    :param str domain: The domain to handle.
-    :param str ip: The current ip.
-    :param list[dict[str,str]] records: The records to update.
-    :return: The query result, tuple of action taken and message.
-    :rtype: tuple(str,str)
+def parse_ini(path):
+    """Minimal INI parser, kept much lighter than :mod:`configparser`.
+
+    Only handles the constructs used by dyn-gandi configurations: sections,
+    ``key = value`` pairs, blank lines and full-line comments. Returns ``None``
+    on anything fancier (continuation lines, interpolation, ...) so the caller
+    can fall back to :mod:`configparser`.
+
+    :param str path: The configuration file path.
+    :return: The configuration sections, or ``None`` on unsupported construct.
+    :rtype: dict[str,dict[str,str]]|None
     """
 
-    # init
-    ldns = LiveDNSClient(url=config['api']['url'], key=config['api']['key'], debug=debug)
+    sections = {}
+    section = None
 
-    # check domain
-    r_domain = ldns.get_domain(domain)
-    if not r_domain:
-        raise RuntimeWarning("The domain %s does not exist." % domain)
+    with open(path, 'r') as file:
+        for line in file:
+            stripped = line.strip()
+            if not stripped or stripped[0] in (';', '#'):
+                continue
 
-    # get DNS IP
-    r_record = ldns.get_domain_record(domain, record_name=records[0]['name'], record_type=records[0]['type'])
-    if not r_record or not r_record.get('values', []):
-        raise RuntimeWarning("Main record not found to check DNS IP for domain %s." % domain)
+            match = _INI_SECTION_RE.match(stripped)
+            if match:
+                if match.group(1) == 'DEFAULT':
+                    # defaults propagation is configparser territory
+                    return None
 
-    dns_ip = r_record['values'][0]
-    message = "Local IP: %s, DNS IP: %s" % (ip, dns_ip)
+                section = sections.setdefault(match.group(1), {})
+                continue
 
-    # PTR record update is needed if '@' record is specified in config
-    update_ptr = '@' in dict((r["name"], r) for r in records) and config['dns'].get('update_ptr', 'false').lower() in ('true', '1', 'yes')
+            match = _INI_KV_RE.match(line.rstrip())
+            if match is None or section is None or '%(' in match.group(2):
+                return None
 
-    # Dry run
-    if dry_run:
-        records_map = ldns.get_domain_records_map(domain)
+            section[match.group(1).lower()] = match.group(2)
 
-        print("======== Dry run ========")
-        if ip == dns_ip and not force:
-            print("# Would not update records (no differences):")
-        else:
-            print("Would update records"+(" (forced)" if force else "")+":")
+    return sections
 
-        for rec in records:
-            rec_key = "%s/%s" % (rec['name'], rec['type'])
-            print("  %s from %s to %s" % (rec_key, records_map.get(rec_key, None), ip))
 
-        if update_ptr:
-            print("  delete PTR %s" % (ptr_record_name(dns_ip)))
-            print("  create PTR %s to %s" % (ptr_record_name(ip), domain))
-        print("=========================")
+def domain_verified(domain):
+    """Check the verified domains cache.
+
+    :param str domain: The domain.
+    :return: ``True`` when the domain existence was verified recently.
+    :rtype: bool
+    """
 
-        return "DRY RUN", message
+    import json
 
-    # compare IPs
-    if ip == dns_ip and not force:
-        return "OK", message
+    try:
+        with open(_DOMAINS_CACHE_FILE, 'r') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return False
 
-    # post snapshot
-    r_snap = ldns.post_domain_snapshot(domain, name="dyn-gandi snapshot")
-    if r_snap is None:
-        raise RuntimeWarning("Could not create snapshot." % domain)
+    return time.time() - cached.get(domain, 0) < _DOMAINS_CACHE_TTL
 
-    snapshot_id = r_snap['id']
 
-    if verbose:
-        print("Backup snapshot created, id: %s." % snapshot_id)
+def mark_domain_verified(domain, verified=True):
+    """Update the verified domains cache, atomically and best effort.
 
-    # update DNS records
-    for rec in records:
-        try:
-            r_update = ldns.put_domain_record(domain=domain, record_name=rec['name'], record_type=rec['type'], value=ip, ttl=int(config['dns']['ttl']))
-        except Exception as e:
-            print(
-                "%s, Error: %s. Backup snapshot id: %s."
-                % (message, repr(e), snapshot_id),
-                file=sys.stderr,
-            )
-            raise e
+    :param str domain: The domain.
+    :param bool verified: Record the verification, or drop it when ``False``.
+    """
 
-        if r_update is None:
-            message = "%s, Error when updating: %s/%s. Backup snapshot id: %s." % (message, rec['name'], rec['type'], snapshot_id)
-            return "ERROR", message
+    import json
 
-        if verbose:
-            print("Updated record %s/%s from %s to %s" % (rec['name'], rec['type'], dns_ip, ip))
-            print("API response: %s" % json.dumps(r_update, indent=2))
+    try:
+        with open(_DOMAINS_CACHE_FILE, 'r') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        cached = {}
 
-    # update PTR record
-    if update_ptr:
-        ldns.delete_domain_record(domain=domain, record_name=ptr_record_name(dns_ip), record_type='PTR')
-        try:
-            r_create = ldns.post_domain_record(domain=domain, record_name=ptr_record_name(ip), record_type='PTR', value=domain, ttl=int(config['dns']['ttl']))
-        except Exception as e:
-            print(
-                "%s, Error: %s. Backup snapshot id: %s."
-                % (message, repr(e), snapshot_id),
-                file=sys.stderr,
+    if verified:
+        cached[domain] = time.time()
+    else:
+        cached.pop(domain, None)
+
+    try:
+        os.makedirs(os.path.dirname(_DOMAINS_CACHE_FILE), exist_ok=True)
+        tmp_file = "%s.tmp.%s" % (_DOMAINS_CACHE_FILE, os.getpid())
+        with open(tmp_file, 'w') as file:
+            json.dump(cached, file)
+        os.replace(tmp_file, _DOMAINS_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def livedns_handle(domain, ip, records):
+    """Query LiveDNS API.
+
+    :param str domain: The domain to handle.
+    :param str ip: The current ip.
+    :param list[dict[str,str]] records: The records to update.
+    :return: The query result, tuple of action taken and message.
+    :rtype: tuple(str,str)
+    """
+
+    # deferred imports, only paid when the API is actually queried
+    import json
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from livedns_client import LiveDNSClient
+
+    # init
+    with LiveDNSClient(url=config['api']['url'], key=config['api']['key'], debug=debug) as ldns:
+
+        # check domain, skipping the preflight GET when verified recently
+        if not domain_verified(domain):
+            r_domain = ldns.get_domain(domain)
+            if not r_domain:
+                raise RuntimeWarning("The domain %s does not exist." % domain)
+
+            mark_domain_verified(domain)
+
+        # get DNS IP
+        r_record = ldns.get_domain_record(domain, record_name=records[0]['name'], record_type=records[0]['type'])
+        if not r_record or not r_record.get('values', []):
+            # drop the cached verification so the next run re-checks the domain
+            mark_domain_verified(domain, verified=False)
+            raise RuntimeWarning("Main record not found to check DNS IP for domain %s." % domain)
+
+        dns_ip = r_record['values'][0]
+        message = "Local IP: %s, DNS IP: %s" % (ip, dns_ip)
+
+        # PTR record update is needed if '@' record is specified in config
+        update_ptr = '@' in dict((r["name"], r) for r in records) and config['dns'].get('update_ptr', 'false').lower() in ('true', '1', 'yes')
+
+        # Dry run
+        if dry_run:
+            # fetch only the handled records, concurrently, instead of the
+            # whole zone record list
+            with ThreadPoolExecutor(max_workers=min(4, len(records))) as executor:
+                current = executor.map(lambda r: ldns.get_domain_record(domain, r['name'], r['type']), records)
+
+            records_map = {}
+            for rec, r_rec in zip(records, current):
+                if r_rec and r_rec.get('values', []):
+                    records_map["%s/%s" % (rec['name'], rec['type'])] = ",".join(r_rec['values'])
+
+            print("======== Dry run ========")
+            if ip == dns_ip and not force:
+                print("# Would not update records (no differences):")
+            else:
+                print("Would update records"+(" (forced)" if force else "")+":")
+
+            for rec in records:
+                rec_key = "%s/%s" % (rec['name'], rec['type'])
+                print("  %s from %s to %s" % (rec_key, records_map.get(rec_key, None), ip))
+
+            if update_ptr:
+                print("  delete PTR %s" % (ptr_record_name(dns_ip)))
+                print("  create PTR %s to %s" % (ptr_record_name(ip), domain))
+            print("=========================")
+
+            return "DRY RUN", message
+
+        # compare IPs
+        if ip == dns_ip and not force:
+            return "OK", message
+
+        # post snapshot when configured, otherwise the previous IP known from
+        # the record GET is enough to roll back a failed update
+        use_snapshot = config['dns'].get('snapshot', 'false').lower() in ('true', '1', 'yes')
+
+        if use_snapshot:
+            r_snap = ldns.post_domain_snapshot(domain, name="dyn-gandi snapshot")
+            if r_snap is None:
+                raise RuntimeWarning("Could not create snapshot." % domain)
+
+            snapshot_id = r_snap['id']
+            backup_label = "Backup snapshot id: %s." % snapshot_id
+
+            if verbose:
+                print("Backup snapshot created, id: %s." % snapshot_id)
+        else:
+            snapshot_id = None
+            backup_label = "Previous IP: %s." % dns_ip
+
+            # keep each record's own values at hand to roll back a failure ;
+            # the main record was already fetched for the IP comparison
+            old_values = {"%s/%s" % (records[0]['name'], records[0]['type']): r_record['values']}
+            if len(records) > 1:
+                others = records[1:]
+                with ThreadPoolExecutor(max_workers=min(4, len(others))) as executor:
+                    current = executor.map(lambda r: ldns.get_domain_record(domain, r['name'], r['type']), others)
+
+                for rec, r_rec in zip(others, current):
+                    if r_rec and r_rec.get('values', []):
+                        old_values["%s/%s" % (rec['name'], rec['type'])] = r_rec['values']
+
+        # update DNS records, in parallel as the PUT requests are independent ;
+        # settle every future before acting on failures, so a rollback cannot
+        # race an update PUT still queued or in flight
+        ttl = int(config['dns']['ttl'])
+        updated = []
+        failed = []
+        first_exc = None
+        with ThreadPoolExecutor(max_workers=min(4, len(records))) as executor:
+            futures = dict(
+                (executor.submit(ldns.put_domain_record, domain=domain, record_name=rec['name'], record_type=rec['type'], value=ip, ttl=ttl), rec)
+                for rec in records
             )
-            raise e
 
-        if r_create is None:
-            message = "%s, Error when creating: %s/PTR. Backup snapshot id: %s." % (message, ptr_record_name(ip), snapshot_id)
-            return "ERROR", message
+            for future in as_completed(futures):
+                rec = futures[future]
+                try:
+                    r_update = future.result()
+                except Exception as e:
+                    failed.append(rec)
+                    if first_exc is None:
+                        first_exc = e
+                    continue
 
-        if verbose:
-            print("Created record %s/PTR to %s" % (ptr_record_name(ip), domain))
-            print("API response: %s" % json.dumps(r_create, indent=2))
+                if r_update is None:
+                    # timeouts and API error responses, see _query_api
+                    failed.append(rec)
+                    continue
 
-    # delete snapshot
-    ldns.delete_domain_snapshot(domain, sid=snapshot_id)
-    if verbose:
-        print("Backup snapshot deleted.")
+                updated.append(rec)
 
-    return "UPDATE", message
+                if verbose:
+                    print("Updated record %s/%s from %s to %s" % (rec['name'], rec['type'], dns_ip, ip))
+                if debug:
+                    print("API response: %s" % json.dumps(r_update, indent=2))
+
+        if failed:
+            if not use_snapshot:
+                # best effort restore of each updated record's own previous
+                # values ; records absent before the update are left as-is
+                for rb_rec in updated:
+                    rb_values = old_values.get("%s/%s" % (rb_rec['name'], rb_rec['type']))
+                    if not rb_values:
+                        continue
+
+                    try:
+                        ldns.put_domain_record(domain=domain, record_name=rb_rec['name'], record_type=rb_rec['type'], value=rb_values, ttl=ttl)
+                    except Exception:
+                        pass
+
+            if first_exc is not None:
+                print(
+                    "%s, Error: %s. %s"
+                    % (message, repr(first_exc), backup_label),
+                    file=sys.stderr,
+                )
+                raise first_exc
+
+            message = "%s, Error when updating: %s. %s" % (message, ", ".join("%s/%s" % (r['name'], r['type']) for r in failed), backup_label)
+            return "ERROR", message
+
+        # update PTR record
+        if update_ptr:
+            ldns.delete_domain_record(domain=domain, record_name=ptr_record_name(dns_ip), record_type='PTR')
+            try:
+                r_create = ldns.post_domain_record(domain=domain, record_name=ptr_record_name(ip), record_type='PTR', value=domain, ttl=int(config['dns']['ttl']))
+            except Exception as e:
+                print(
+                    "%s, Error: %s. %s"
+                    % (message, repr(e), backup_label),
+                    file=sys.stderr,
+                )
+                raise e
+
+            if r_create is None:
+                message = "%s, Error when creating: %s/PTR. %s" % (message, ptr_record_name(ip), backup_label)
+                return "ERROR", message
+
+            if verbose:
+                print("Created record %s/PTR to %s" % (ptr_record_name(ip), domain))
+            if debug:
+                print("API response: %s" % json.dumps(r_create, indent=2))
+
+        # delete snapshot
+        if use_snapshot:
+            ldns.delete_domain_snapshot(domain, sid=snapshot_id)
+            if verbose:
+                print("Backup snapshot deleted.")
+
+        return "UPDATE", message
 
 
 def ptr_record_name(ip):
@@ -194,6 +370,9 @@ def ptr_record_name(ip):
 def main():
     """Main method."""
 
+    # deferred imports, never paid by --help
+    from ip_resolver import IpResolver, IpResolverError
+
     # Init environment
     parse_options()
     parse_configuration()
@@ -201,7 +380,7 @@ def main():
 
     # Parse IP
     try:
-        ip_resolver = IpResolver(url=config['ip']['resolver_url'], alt_url=config['ip'].get('resolver_url_alt', None))
+        ip_resolver = IpResolver(url=config['ip']['resolver_url'], alt_url=config['ip'].get('resolver_url_alt', None), cache_ttl=int(config['ip'].get('cache_ttl', 0) or 0))
         ip = ip_resolver.resolve_ip()
     except IpResolverError as e:
         print("%s - %s [ERROR]" % (today, str(e)), file=sys.stderr)
@@ -210,31 +389,46 @@ def main():
     if verbose:
         print("Resolved IP: %s" % ip)
 
-    # Write IP file output
+    # Read IP file output
+    file_ip = None
+    file_mtime = None
     if out_file:
-        file_ip = None
-        if os.path.exists(out_file):
-            with open(out_file, 'r') as file:
-                file_ip = file.readline().strip()
-
-        if ip != file_ip:
-            with open(out_file, 'w') as file:
-                file.write(ip)
-                file.write("\n")
-
-                if verbose:
-                    print("Wrote %s to %s file." % (ip, out_file))
+        try:
+            # the file only ever holds one IP, a single raw read is enough
+            fd = os.open(out_file, os.O_RDONLY)
+            try:
+                file_ip = os.read(fd, 64).decode('ascii', 'replace').split('\n', 1)[0].strip()
+                file_mtime = os.fstat(fd).st_mtime
+            finally:
+                os.close(fd)
+        except FileNotFoundError:
+            pass
+
+        if ip == file_ip and not force and not dry_run:
+            # IP unchanged since the last successful check: skip the LiveDNS
+            # API calls entirely until the skip TTL expires, so an eventual
+            # DNS drift is still repaired
+            skip_ttl = int(config['dns'].get('skip_ttl', 3600))
+            if skip_ttl > 0 and file_mtime is not None and time.time() - file_mtime < skip_ttl:
+                to_log("Local IP: %s (cached)" % ip, "OK", datetime_label=today, dump=True)
+                return
 
     # Query LiveDNS API
     domain = config['dns']['domain']  # type: str
 
-    # Sub-domain check
-    domain_ext = tldextract.extract(domain)
-    if domain_ext.subdomain:
-        if verbose:
-            print("Warning: removing sub-domain part of %s" % domain)
+    # Sub-domain check ; a single-dot domain can never hold a sub-domain, and
+    # users giving the registered domain can opt out, skipping the public
+    # suffix list lookup of tldextract entirely
+    strip_subdomain = config['dns'].get('strip_subdomain', 'true').lower() in ('true', '1', 'yes')
+    if strip_subdomain and domain.count('.') > 1:
+        import tldextract
 
-        domain = f'{domain_ext.domain}.{domain_ext.suffix}'
+        domain_ext = tldextract.extract(domain)
+        if domain_ext.subdomain:
+            if verbose:
+                print("Warning: removing sub-domain part of %s" % domain)
+
+            domain = f'{domain_ext.domain}.{domain_ext.suffix}'
 
     if verbose:
         print("Domain: %s" % domain)
@@ -255,6 +449,23 @@ def main():
         action, message = "ERROR", "LiveDNS error: %s" % str(e)
         to_log(message, action, datetime_label=today, dump=True)
 
+    # Write IP file output on a successful check only, so a failed update is
+    # retried on the next run instead of arming the skip shortcut
+    if out_file and action in ("OK", "UPDATE"):
+        if ip != file_ip:
+            with open(out_file, 'w') as file:
+                file.write(ip)
+                file.write("\n")
+
+            if verbose:
+                print("Wrote %s to %s file." % (ip, out_file))
+        else:
+            # refresh the timestamp to rearm the skip TTL
+            try:
+                os.utime(out_file, None)
+            except FileNotFoundError:
+                pass
+
     # output log
     if verbose:
         print()
@@ -280,18 +491,21 @@ def to_log(message, action, datetime_label=None, dump=False):
         print(log_line)
 
     if log_file:
-        mode = 'a'
-        if not os.path.exists(log_file):
-            mode = 'x'
-
-        with open(log_file, mode=mode) as file:
-            file.write(log_line)
-            file.write("\n")
+        # single raw append write, skipping the TextIOWrapper machinery ;
+        # O_CREAT still creates the file when missing without a race
+        fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, ("%s\n" % log_line).encode('utf-8'))
+        finally:
+            os.close(fd)
 
 
 def cli():
     """Command-line interface"""
 
+    import docopt as docpt
+    from docopt import docopt
+
     global options
     options = docopt(__doc__)
     try:
@@ -1,7 +1,13 @@
+import os
 import re
+import socket
+import time
 
-import requests
-from requests import Timeout
+# compiled once at import, resolve_ip() may run several times per process
+_IPV4_RE = re.compile(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
+
+# resolved IP cache, shared between invocations
+_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "dyn-gandi", "ip.cache")
 
 
 class IpResolverError(Exception):
@@ -16,25 +22,88 @@ class IpResolver:
     Parse the IP from a website containing plain text, or web page with a single IP.
     """
 
-    def __init__(self, url, alt_url=None):
+    def __init__(self, url, alt_url=None, cache_ttl=0):
         """IP resolver.
 
         Parse the IP from a website containing plain text, or web page with a single IP.
 
         :param str url: The resolver URL.
         :param str alt_url: Alternative resolver URL.
+        :param int cache_ttl: Resolved IP cache validity in seconds. ``(default: 0, disabled)``
         """
 
         self.url = url
         self.alt_url = alt_url
+        self.cache_ttl = cache_ttl
 
     def resolve_ip(self):
+        """Resolve the IP, from the on-disk cache when fresh enough, else by
+        parsing the content of the resolver URL.
+
+        :return: The resolved IP.
+        :rtype: str
+        """
+
+        if self.cache_ttl > 0:
+            ip = self._read_cache()
+            if ip is not None:
+                return ip
+
+        ip = self._resolve_ip_remote()
+
+        if self.cache_ttl > 0:
+            self._write_cache(ip)
+
+        return ip
+
+    def _read_cache(self):
+        """Read the cached IP, if it matches the resolver URL and is fresh enough.
+
+        :return: The cached IP, or ``None``.
+        :rtype: str|None
+        """
+
+        import json
+
+        try:
+            with open(_CACHE_FILE, 'r') as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get('resolver_url') != self.url or time.time() - cached.get('ts', 0) >= self.cache_ttl:
+            return None
+
+        return cached.get('ip')
+
+    def _write_cache(self, ip):
+        """Write the resolved IP to the cache file, atomically and best effort.
+
+        :param str ip: The resolved IP.
+        """
+
+        import json
+
+        try:
+            os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
+            tmp_file = "%s.tmp.%s" % (_CACHE_FILE, os.getpid())
+            with open(tmp_file, 'w') as file:
+                json.dump({"resolver_url": self.url, "ip": ip, "ts": time.time()}, file)
+            os.replace(tmp_file, _CACHE_FILE)
+        except OSError:
+            pass
+
+    def _resolve_ip_remote(self):
         """Resolve the IP by parsing the content of the resolver URL.
 
         :return: The resolved IP.
         :rtype: str
         """
 
+        # deferred import, only paid when actually resolving
+        import requests
+        from requests import Timeout
+
         r = None
         try:
             r = requests.get(self.url, timeout=30.0)
@@ -65,11 +134,22 @@ class IpResolver:
         if not r.content:
             raise IpResolverError("Invalid content returned by IP resolver.")
 
-        match = re.search("(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})", r.text)
-
-        if not match:
-            raise IpResolverError("IP not found in resolver content.")
-
-        ip = match.group(1)
+        # fast path: most resolvers return the bare IP as plain text, no need
+        # to decode and scan a whole page
+        try:
+            ip = r.content.strip().decode('ascii')
+            socket.inet_aton(ip)
+            return ip
+        except (UnicodeDecodeError, OSError):
+            pass
+
+        # fall back to scanning the page content, validating each candidate
+        for match in _IPV4_RE.finditer(r.content.decode('ascii', 'replace')):
+            ip = match.group(1)
+            try:
+                socket.inet_aton(ip)
+                return ip
+            except OSError:
+                continue
 
-        return ip
+        raise IpResolverError("IP not found in resolver content.")
@@ -1,9 +1,10 @@
-import json
-import re
 import urllib.parse
 
-import requests
-from requests import Timeout
+
+def _strip_rrset(d):
+    """Shorten the ``rrset_*`` keys of a decoded JSON object."""
+
+    return dict((k[6:] if k.startswith('rrset_') else k, v) for k, v in d.items())
 
 
 class LiveDNSClient:
@@ -16,10 +17,38 @@ class LiveDNSClient:
         :param str key: The API key.
         :param bool debug: Debug flag.
         """
+
+        # deferred import, only paid once a client is built
+        import requests
+        from requests.adapters import HTTPAdapter
+
         self.url = url
         self.key = key
         self.debug = debug
 
+        # persistent session to reuse the TCP+TLS connection across API calls
+        self._session = requests.Session()
+        self._session.mount(self.url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.headers.update({
+            "x-api-key":        self.key,
+            "Authorization":    "Bearer %s" % self.key,
+            "Accept":           "application/json",
+        })
+
+        # per-call header delta for JSON payloads, built once
+        self._json_headers = {"Content-type": "application/json"}
+
+    def close(self):
+        """Close the underlying HTTP session."""
+
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def _query_api(self, method, query, json_data=None):
         """Query LiveDNS API.
 
@@ -34,29 +63,29 @@ class LiveDNSClient:
         if not self.url.endswith("/") and not query.startswith("/"):
             query = "/%s" % query
 
-        url = "%s%s" % (self.url, urllib.parse.quote(query))
+        # quoting is a no-op for plain ASCII paths, the common case here
+        if query.isascii() and '%' not in query and ' ' not in query:
+            url = "%s%s" % (self.url, query)
+        else:
+            url = "%s%s" % (self.url, urllib.parse.quote(query))
 
-        headers = {
-            "x-api-key":        self.key,
-            "Authorization":    "Bearer %s" % self.key,
-            "Accept":           "application/json",
-        }
-
-        if json_data:
-            headers['Content-type'] = "application/json"
+        headers = self._json_headers if json_data else None
 
         if self.debug:
             print("Requests: method=%s url=%s headers=%s json=%s" % (method, url, headers, json_data))
 
         # request
+        from requests import Timeout
+
         try:
-            r = requests.request(method=method, url=url, headers=headers, json=json_data, timeout=60.0)
+            r = self._session.request(method=method, url=url, headers=headers, json=json_data, timeout=60.0)
             if r.status_code == 403:
-                # on reject, also try the old API key authentication method
-                headers["Authorization"] = headers.get("Authorization").replace("Bearer", "Apikey")
+                # on reject, also try the old API key authentication method ;
+                # copy so the shared header dict is never mutated
+                headers = dict(headers or {}, Authorization="Apikey %s" % self.key)
                 if self.debug:
                     print("Requests: method=%s url=%s headers=%s json=%s" % (method, url, headers, json_data))
-                r = requests.request(method=method, url=url, headers=headers, json=json_data, timeout=60.0)
+                r = self._session.request(method=method, url=url, headers=headers, json=json_data, timeout=60.0)
         except Timeout:
             if self.debug:
                 print("Timeout error.")
@@ -71,8 +100,9 @@ class LiveDNSClient:
         if r.status_code == 204:  # HTTP/204 No content (on success)
             return {"code": 204, "message": "ok"}
 
-        # parse response
-        r_json = json.loads(re.sub('"rrset_', '"', r.text))  # shorten 'rrset_*' keys
+        # parse response, shortening 'rrset_*' keys while parsing instead of
+        # rewriting the whole body beforehand
+        r_json = r.json(object_hook=_strip_rrset)
         return r_json
 
     def get_domains(self):